@@ -0,0 +1,437 @@
+"""Grade many student repos at once, optionally split across machines.
+
+Repos are assigned to shards by hashing their path (relative to the batch
+root) and assignment, so every node computes the same partition without a
+coordinator. Each shard writes a self-describing partial results file and
+``merge_results`` combines them into the final report.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from importlib.metadata import version as get_installed_version, PackageNotFoundError
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple
+
+import pytest
+
+from check_pfda.preflight import get_manifest, run_preflight
+from check_pfda.utils import TestFileError, _match_assignment_from_config, get_tests
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_TIMEOUT = 120
+
+
+class ShardSpec(NamedTuple):
+    """Which slice of the discovered repos this node grades (1-based index)."""
+
+    index: int
+    count: int
+
+
+UNSHARDED = ShardSpec(1, 1)
+
+
+class RepoJob(NamedTuple):
+    """A student repo and the assignment it was matched to."""
+
+    repo: str
+    chapter: str
+    assignment: str
+
+
+class MergeError(Exception):
+    """Raised when partial results cannot be combined into a report."""
+
+    pass
+
+
+def parse_shard(value: str) -> ShardSpec:
+    """Parse an ``i/n`` shard spec such as ``2/8``.
+
+    :param value: The spec to parse.
+    :type value: str
+    :return: The parsed shard.
+    :rtype: ShardSpec
+    :raises ValueError: If the spec is malformed or ``i`` is not in ``1..n``.
+    """
+    index_str, sep, count_str = value.partition("/")
+    try:
+        index, count = int(index_str), int(count_str)
+    except ValueError:
+        index = count = 0
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}'. Expected i/n with 1 <= i <= n, e.g. 2/8.")
+    return ShardSpec(index=index, count=count)
+
+
+def discover_jobs(root: Path, config: dict) -> List[RepoJob]:
+    """Find every student repo under ``root`` that matches an assignment.
+
+    :param root: The directory containing the student repos.
+    :type root: Path
+    :param config: The parsed YAML configuration dictionary.
+    :type config: dict
+    :return: The matched repos, sorted by path.
+    :rtype: List[RepoJob]
+    """
+    jobs = []
+    for dirpath, dirnames, _ in os.walk(root):
+        repo_names = [d for d in dirnames if "pfda-c" in d]
+        # Don't descend into repos themselves or hidden folders such as .git.
+        dirnames[:] = [d for d in dirnames if d not in repo_names and not d.startswith(".")]
+        for name in repo_names:
+            repo_path = Path(dirpath) / name
+            assignment = _match_assignment_from_config(config, name)
+            if assignment is None:
+                logger.debug("Skipping unmatched repo: %s", repo_path)
+                continue
+            jobs.append(
+                RepoJob(
+                    repo=repo_path.relative_to(root).as_posix(),
+                    chapter=assignment.chapter,
+                    assignment=assignment.name,
+                )
+            )
+    return sorted(jobs)
+
+
+def shard_of(job: RepoJob, count: int) -> int:
+    """Get the 1-based shard a repo belongs to out of ``count`` shards.
+
+    :param job: The repo to place.
+    :type job: RepoJob
+    :param count: The total number of shards.
+    :type count: int
+    :return: The shard index.
+    :rtype: int
+    """
+    digest = hashlib.sha256(_job_key(job).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def run_batch(
+    root: Path,
+    out_dir: Path,
+    shard: ShardSpec = UNSHARDED,
+    local_tests_root: Path | None = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    config: dict | None = None,
+) -> Path:
+    """Grade this node's shard of the repos under ``root``.
+
+    :param root: The directory containing the student repos.
+    :type root: Path
+    :param out_dir: Where to write the partial results file.
+    :type out_dir: Path
+    :param shard: Which shard this node grades.
+    :type shard: ShardSpec
+    :param local_tests_root: Load tests from this directory instead of the remote repo.
+    :type local_tests_root: Path | None
+    :param timeout: Seconds a single repo's tests may run before being stopped.
+    :type timeout: int
+    :param config: The parsed YAML configuration dictionary.
+    :type config: dict | None
+    :return: The path of the partial results file.
+    :rtype: Path
+    """
+    config = config or {}
+    all_jobs = discover_jobs(root, config)
+    jobs = [job for job in all_jobs if shard_of(job, shard.count) == shard.index]
+    logger.debug(
+        "Shard %d/%d: %d of %d repos", shard.index, shard.count, len(jobs), len(all_jobs)
+    )
+
+    started = time.monotonic()
+    test_sources: Dict[tuple, str | None] = {}
+    results = []
+    for job in jobs:
+        key = (job.chapter, job.assignment)
+        if key not in test_sources:
+            try:
+                test_sources[key] = get_tests(job.chapter, job.assignment, local_tests_root)
+            except TestFileError:
+                test_sources[key] = None
+        results.append(
+            _grade_repo(root / job.repo, job, test_sources[key], config, timeout)
+        )
+
+    partial = {
+        "kind": "shard",
+        "format": RESULTS_FORMAT_VERSION,
+        "tool_version": _tool_version(),
+        "shard": {"index": shard.index, "count": shard.count},
+        "discovered": len(all_jobs),
+        "discovered_digest": _jobs_digest(all_jobs),
+        "jobs": [_job_key(job) for job in jobs],
+        "results": results,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+    out_path = out_dir / f"shard-{shard.index:03d}-of-{shard.count:03d}.json"
+    _write_json(out_path, partial)
+    return out_path
+
+
+def merge_results(paths: Iterable[Path]) -> dict:
+    """Combine partial results files into the final report.
+
+    :param paths: Partial results files, or directories containing them.
+    :type paths: Iterable[Path]
+    :return: The final report.
+    :rtype: dict
+    :raises MergeError: If files are unreadable, from different runs or
+        check-pfda versions, or shards are missing or duplicated.
+    """
+    partials = {}
+    for path in _expand_partial_paths(paths):
+        try:
+            partial = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            raise MergeError(f"Could not read partial results file {path}: {e}")
+        _validate_partial(path, partial)
+        if partials:
+            first_path, first = next(iter(partials.values()))
+            if partial["shard"]["count"] != first["shard"]["count"]:
+                raise MergeError(
+                    f"{path} is shard {partial['shard']['index']}/{partial['shard']['count']} "
+                    f"but {first_path} is from a {first['shard']['count']}-shard run."
+                )
+            if partial.get("tool_version") != first.get("tool_version"):
+                raise MergeError(
+                    f"{path} was graded by check-pfda {partial.get('tool_version')} "
+                    f"but {first_path} by {first.get('tool_version')}. "
+                    f"Regrade all shards with the same version."
+                )
+            if partial["discovered_digest"] != first["discovered_digest"]:
+                raise MergeError(
+                    f"{path} and {first_path} discovered different repos. "
+                    f"All shards must grade the same directory tree."
+                )
+        index = partial["shard"]["index"]
+        if index in partials:
+            raise MergeError(
+                f"Duplicate shard {index}: {partials[index][0]} and {path}."
+            )
+        partials[index] = (path, partial)
+
+    if not partials:
+        raise MergeError("No partial results files were found.")
+
+    count = next(iter(partials.values()))[1]["shard"]["count"]
+    missing = sorted(set(range(1, count + 1)) - set(partials))
+    if missing:
+        raise MergeError(
+            f"Missing shard(s) {', '.join(str(i) for i in missing)} of {count}."
+        )
+
+    results = {}
+    for path, partial in partials.values():
+        keys = [_job_key(RepoJob(r["repo"], r["chapter"], r["assignment"]))
+                for r in partial["results"]]
+        if sorted(keys) != sorted(partial["jobs"]):
+            raise MergeError(f"{path} is incomplete: not every assigned repo has a result.")
+        for key, result in zip(keys, partial["results"]):
+            if key in results:
+                raise MergeError(f"Repo graded by more than one shard: {key}")
+            results[key] = result
+
+    ordered = [results[key] for key in sorted(results)]
+    return {
+        "kind": "report",
+        "format": RESULTS_FORMAT_VERSION,
+        "repos": len(ordered),
+        "summary": dict(sorted(Counter(r["status"] for r in ordered).items())),
+        "results": ordered,
+    }
+
+
+def write_report(report: dict, path: Path) -> None:
+    """Write the final report as JSON.
+
+    :param report: The report from ``merge_results``.
+    :type report: dict
+    :param path: Where to write it.
+    :type path: Path
+    """
+    _write_json(path, report)
+
+
+def _grade_repo(
+    repo_path: Path,
+    job: RepoJob,
+    test_source: str | None,
+    config: dict,
+    timeout: int,
+) -> dict:
+    """Run the pre-flight check and the tests for one repo in a subprocess.
+
+    :param repo_path: The repo's absolute path.
+    :type repo_path: Path
+    :param job: The repo's job.
+    :type job: RepoJob
+    :param test_source: The test file's content, or None if it couldn't be loaded.
+    :type test_source: str | None
+    :param config: The parsed YAML configuration dictionary.
+    :type config: dict
+    :param timeout: Seconds the tests may run before being stopped.
+    :type timeout: int
+    :return: The repo's result.
+    :rtype: dict
+    """
+    result = {
+        "repo": job.repo,
+        "chapter": job.chapter,
+        "assignment": job.assignment,
+        "status": "passed",
+        "tests": 0,
+        "failures": 0,
+        "errors": 0,
+        "skipped": 0,
+        "problems": [],
+        "warnings": [],
+    }
+    if test_source is None:
+        result["status"] = "no-test-file"
+        return result
+
+    src_dir = repo_path / "src"
+    # Pre-flight findings are recorded for the report but never decide the
+    # grade; pytest still runs, and the timeout stops code that hangs.
+    preflight = run_preflight(src_dir, get_manifest(config, job.assignment))
+    result.update(problems=preflight.problems, warnings=preflight.warnings)
+
+    tests_dir = repo_path / ".tests"
+    tests_dir.mkdir(exist_ok=True)
+    test_file_path = tests_dir / f"test_{job.assignment}.py"
+    test_file_path.write_text(test_source, encoding="utf-8")
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (str(src_dir.resolve()), env.get("PYTHONPATH")) if p
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        junit_path = Path(tmp) / "junit.xml"
+        args = [sys.executable, "-m", "pytest", str(test_file_path), "-q",
+                "-p", "no:cacheprovider", f"--junitxml={junit_path}"]
+        logger.debug("Running %s in %s", args, repo_path)
+        try:
+            proc = subprocess.run(
+                args, cwd=repo_path, env=env, capture_output=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            result["status"] = "timeout"
+            return result
+        if junit_path.exists():
+            result.update(_read_junit_counts(junit_path))
+
+    if proc.returncode == pytest.ExitCode.OK:
+        result["status"] = "passed"
+    elif proc.returncode == pytest.ExitCode.TESTS_FAILED:
+        result["status"] = "failed"
+    elif proc.returncode == pytest.ExitCode.NO_TESTS_COLLECTED:
+        result["status"] = "no-tests"
+    else:
+        result["status"] = "error"
+    return result
+
+
+def _read_junit_counts(junit_path: Path) -> dict:
+    """Sum the test counts in a pytest JUnit XML report.
+
+    :param junit_path: The report to read.
+    :type junit_path: Path
+    :return: The ``tests``, ``failures``, ``errors`` and ``skipped`` totals.
+    :rtype: dict
+    """
+    counts = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+    try:
+        root = ET.parse(junit_path).getroot()
+    except ET.ParseError:
+        logger.exception("Could not parse JUnit report: %s", junit_path)
+        return counts
+    suites = [root] if root.tag == "testsuite" else root.iter("testsuite")
+    for suite in suites:
+        for field in counts:
+            counts[field] += int(suite.get(field, 0))
+    return counts
+
+
+def _validate_partial(path: Path, partial: object) -> None:
+    """Check that a loaded file is a shard results file this version can merge.
+
+    :param path: The file the data was loaded from.
+    :type path: Path
+    :param partial: The loaded JSON data.
+    :type partial: object
+    :raises MergeError: If the data isn't a well-formed shard results file.
+    """
+    if not isinstance(partial, dict) or partial.get("kind") != "shard":
+        raise MergeError(f"{path} is not a shard results file written by 'pfda batch'.")
+    if partial.get("format") != RESULTS_FORMAT_VERSION:
+        raise MergeError(
+            f"{path} has results format {partial.get('format')!r}, "
+            f"expected {RESULTS_FORMAT_VERSION}."
+        )
+    shard = partial.get("shard")
+    if (
+        not isinstance(shard, dict)
+        or not all(isinstance(shard.get(k), int) for k in ("index", "count"))
+        or not 1 <= shard["index"] <= shard["count"]
+        or not isinstance(partial.get("discovered_digest"), str)
+        or not isinstance(partial.get("jobs"), list)
+        or not isinstance(partial.get("results"), list)
+        or not all(
+            isinstance(r, dict) and all(k in r for k in ("repo", "chapter", "assignment", "status"))
+            for r in partial["results"]
+        )
+    ):
+        raise MergeError(f"{path} is malformed or incomplete.")
+
+
+def _expand_partial_paths(paths: Iterable[Path]) -> List[Path]:
+    expanded = []
+    for path in paths:
+        if path.is_dir():
+            expanded.extend(sorted(path.glob("shard-*-of-*.json")))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def _job_key(job: RepoJob) -> str:
+    return f"c{job.chapter}/{job.assignment}/{job.repo}"
+
+
+def _jobs_digest(jobs: List[RepoJob]) -> str:
+    joined = "\n".join(sorted(_job_key(job) for job in jobs))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def _tool_version() -> str:
+    try:
+        return get_installed_version("check-pfda")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """Write JSON atomically so an interrupted run never leaves a partial file.
+
+    :param path: Where to write.
+    :type path: Path
+    :param data: The data to serialize.
+    :type data: dict
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
@@ -1,13 +1,27 @@
 """Command-line interface for package usage."""
 import logging
+import sys
 from pathlib import Path
 
 import click
+from click.core import ParameterSource
 
-from .core import check_student_code
+from .batch import (DEFAULT_TIMEOUT, UNSHARDED, MergeError, merge_results, parse_shard,
+                    run_batch, write_report)
+from .debug_log import start_debug_log
+from .utils import _load_config_yaml
 
 
-@click.command()
+def _parse_shard_option(ctx, param, value):
+    if value is None:
+        return UNSHARDED
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+@click.group(invoke_without_command=True)
 @click.option(
     '-v', '--verbosity',
     default=2,
@@ -30,10 +44,119 @@ from .core import check_student_code
     default=False,
     help='Enable debug mode.',
 )
-def cli(verbosity, tests_dir, debug):
+@click.option(
+    '--skip-preflight',
+    is_flag=True,
+    default=False,
+    help='Run the tests even if the static pre-flight check of src/ finds problems.',
+)
+@click.pass_context
+def cli(ctx, verbosity, tests_dir, debug, skip_preflight):
     """Run student code checks."""
+    if ctx.invoked_subcommand is not None:
+        given = [
+            param.opts[-1] for param in ctx.command.params
+            if ctx.get_parameter_source(param.name) is not ParameterSource.DEFAULT
+        ]
+        if given:
+            raise click.UsageError(
+                f"{', '.join(given)} only apply when checking the current repo. "
+                f"Pass options after '{ctx.invoked_subcommand}' instead."
+            )
+        return
+    # Imported here because core locates the student repo from the cwd on import,
+    # which the batch commands don't need.
+    from .core import check_student_code
+
     check_student_code(
         verbosity=verbosity,
         logger_level=logging.DEBUG if debug else logging.INFO,
         tests_dir=tests_dir,
+        preflight=not skip_preflight,
+    )
+
+
+@cli.command()
+@click.argument(
+    'root',
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.option(
+    '--shard',
+    default=None,
+    callback=_parse_shard_option,
+    help='Grade only shard i of n (e.g. 2/8). Every node must use the same n and ROOT layout.',
+)
+@click.option(
+    '--out',
+    'out_dir',
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path('pfda-results'),
+    show_default=True,
+    help='Directory to write the partial results file (and the report for unsharded runs) to.',
+)
+@click.option(
+    '--dir',
+    'tests_dir',
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help='Use test files from this local directory instead of the remote tests repo.',
+)
+@click.option(
+    '--timeout',
+    default=DEFAULT_TIMEOUT,
+    type=int,
+    show_default=True,
+    help='Seconds one repo\'s tests may run before being stopped.',
+)
+@click.option(
+    '--debug',
+    is_flag=True,
+    default=False,
+    help='Write a debug log for this run to <out>/debug_logs.',
+)
+def batch(root, shard, out_dir, tests_dir, timeout, debug):
+    """Grade every student repo found under ROOT."""
+    if debug:
+        start_debug_log(out_dir / 'debug_logs')
+    partial_path = run_batch(
+        root.resolve(),
+        out_dir,
+        shard=shard,
+        local_tests_root=tests_dir,
+        timeout=timeout,
+        config=_load_config_yaml(),
     )
+    click.secho(f"Wrote shard {shard.index}/{shard.count} results to {partial_path}", fg="green")
+    if shard.count == 1:
+        _write_merged_report([partial_path], out_dir / 'report.json')
+
+
+@cli.command()
+@click.argument(
+    'partials',
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, path_type=Path),
+)
+@click.option(
+    '-o', '--output',
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=Path('report.json'),
+    show_default=True,
+    help='Where to write the merged report.',
+)
+def merge(partials, output):
+    """Merge shard results files (or directories of them) into one report."""
+    _write_merged_report(partials, output)
+
+
+def _write_merged_report(partials, output):
+    try:
+        report = merge_results(partials)
+    except MergeError as e:
+        click.secho(f"Unable to merge results: {e}", fg="red", bold=True)
+        sys.exit(1)
+    write_report(report, output)
+    summary = ", ".join(f"{status}: {n}" for status, n in report["summary"].items())
+    click.secho(f"Wrote report for {report['repos']} repos to {output} ({summary or 'empty'})", fg="green")
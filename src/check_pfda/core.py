@@ -8,9 +8,11 @@ import logging
 
 from click import echo, secho
 import pytest
+from check_pfda.debug_log import start_debug_log
+from check_pfda.preflight import get_manifest, run_preflight
 from check_pfda.utils import (check_for_updates, get_current_assignment, _add_to_path,
-                              _recurse_to_repo_path, _set_up_test_file, _log_package_info,
-                              _log_platform_info)
+                              _load_config_yaml, _recurse_to_repo_path, _set_up_test_file,
+                              _log_package_info, _log_platform_info)
 
 
 LOGGER = logging.getLogger(__name__)
@@ -18,25 +20,29 @@ LOGGER = logging.getLogger(__name__)
 REPO_PATH = _recurse_to_repo_path(Path.cwd())
 REPO_SRC_DIR = REPO_PATH / "src"
 REPO_TESTS_DIR = REPO_PATH / ".tests"
-REPO_LOG_FILE = REPO_PATH / "debug.log"
+REPO_LOG_DIR = REPO_PATH / "debug_logs"
 
 
 def check_student_code(
     verbosity: int = 2,
     logger_level=logging.INFO,
     tests_dir: Path | None = None,
+    preflight: bool = True,
 ) -> None:
     """Main check-pfda runner. Outputs results of tests to scripts in `src` to stdout."""
     check_for_updates()
-    _init_logger(REPO_LOG_FILE, logger_level)
+    _init_logger(REPO_LOG_DIR, logger_level)
     current_assignment = get_current_assignment(REPO_PATH)
     if not current_assignment:
         echo("Unable to match chapter and assignment against cwd. Contact your TA.")
         return
 
+    if preflight and not _preflight_student_code(current_assignment.name):
+        return
+
     REPO_TESTS_DIR.mkdir(exist_ok=True)
 
-    LOGGER.debug(f"Created/verified .tests directory: {REPO_TESTS_DIR}")
+    LOGGER.debug("Created/verified .tests directory: %s", REPO_TESTS_DIR)
 
     test_file_path = _set_up_test_file(current_assignment, REPO_TESTS_DIR, tests_dir)
     secho(f"Checking chapter {current_assignment.chapter} assignment {current_assignment.name} at verbosity {verbosity}...", fg="green")
@@ -44,19 +50,32 @@ def check_student_code(
         _test_student_code(test_file_path, verbosity)
 
 
-def _init_logger(log_file: Path, log_level):
+def _init_logger(log_dir: Path, log_level):
     if not log_level == logging.DEBUG:
         return
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        filename=log_file,
-        filemode='w'
-    )
+    log_file = start_debug_log(log_dir)
+    LOGGER.debug("Writing debug log to: %s", log_file)
     _log_platform_info()
     _log_package_info()
-    LOGGER.debug(f"Current working directory: {os.getcwd()}")
-    LOGGER.debug(f"sys.path: {sys.path}")
+    LOGGER.debug("Current working directory: %s", os.getcwd())
+    LOGGER.debug("sys.path: %s", list(sys.path))
+
+
+def _preflight_student_code(assignment_name: str) -> bool:
+    manifest = get_manifest(_load_config_yaml(), assignment_name)
+    result = run_preflight(REPO_SRC_DIR, manifest)
+    for warning in result.warnings:
+        secho(f"Warning: {warning}", fg="yellow")
+    if not result.problems:
+        return True
+    problem_list = "\n- ".join(result.problems)
+    secho(
+        f"Your code has problems that would make every test fail, so the tests were not run:"
+        f"\n- {problem_list}",
+        fg="red",
+        bold=True,
+    )
+    return False
 
 
 def _test_student_code(test_file_path: Path, verbosity: int):
@@ -65,13 +84,13 @@ def _test_student_code(test_file_path: Path, verbosity: int):
         if verbosity > 0:
             args.append(f"-{'v' * verbosity}")
 
-        LOGGER.debug(f"Running pytest with args: {args}")
+        LOGGER.debug("Running pytest with args: %s", args)
 
         out = pytest.main(args)
-        LOGGER.debug(f"Pytest output:\n{out}")
+        LOGGER.debug("Pytest output:\n%s", out)
     except ImportError as e:
         echo(f"Error importing pytest: {e}")
         LOGGER.exception("Failed to import pytest.")
     except PermissionError as e:
         echo(f"Encountered a permission error when trying to access the test file: {e}")
-        LOGGER.exception(f"Failed to write test: {e}")
+        LOGGER.exception("Failed to write test: %s", e)
@@ -0,0 +1,127 @@
+"""Background debug logging that keeps file I/O off the calling thread.
+
+Records are put on an in-memory queue as-is and a listener thread formats
+them as JSON lines into a per-run, size-rotated file. Messages are only
+formatted on that thread, so callers must pass ``%s`` arguments instead of
+pre-formatted f-strings, and should snapshot anything that may be mutated
+later (e.g. ``list(sys.path)``).
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+MAX_KEPT_RUNS = 10
+
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    """Format each record as one compact JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record as a JSON line.
+
+        :param record: The record to format.
+        :type record: logging.LogRecord
+        :return: The JSON-encoded record.
+        :rtype: str
+        """
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueue records without formatting them on the calling thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Pass the record through untouched; the listener formats it.
+
+        :param record: The record to enqueue.
+        :type record: logging.LogRecord
+        :return: The same record.
+        :rtype: logging.LogRecord
+        """
+        return record
+
+
+def start_debug_log(log_dir: Path) -> Path:
+    """Send all log records to a new per-run file in ``log_dir``.
+
+    :param log_dir: The directory to keep debug logs in.
+    :type log_dir: Path
+    :return: The path of this run's log file.
+    :rtype: Path
+    """
+    global _listener, _queue_handler
+    stop_debug_log()
+
+    log_dir.mkdir(parents=True, exist_ok=True)
+    _prune_old_runs(log_dir, MAX_KEPT_RUNS - 1)
+    log_file = log_dir / f"debug-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"
+
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8", delay=True,
+    )
+    file_handler.setFormatter(_JsonLinesFormatter())
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _DeferredQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, file_handler)
+    _listener.start()
+
+    root_logger = logging.getLogger()
+    root_logger.addHandler(_queue_handler)
+    root_logger.setLevel(logging.DEBUG)
+    return log_file
+
+
+def stop_debug_log() -> None:
+    """Flush queued records to disk and stop the listener thread."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+
+# Registered once; a no-op unless a debug log is running at exit.
+atexit.register(stop_debug_log)
+
+
+def _prune_old_runs(log_dir: Path, keep: int) -> None:
+    """Delete all but the newest ``keep`` runs' log files.
+
+    :param log_dir: The directory holding debug logs.
+    :type log_dir: Path
+    :param keep: How many previous runs to keep.
+    :type keep: int
+    """
+    runs = sorted(log_dir.glob("debug-*.jsonl"), key=lambda p: p.stat().st_mtime)
+    for run in runs[:max(len(runs) - keep, 0)]:
+        for path in log_dir.glob(f"{run.name}*"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
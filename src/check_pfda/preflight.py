@@ -0,0 +1,299 @@
+"""Static checks on student code that run before pytest is started."""
+
+import ast
+import functools
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+AST_CACHE_SIZE = 256
+
+# Builtins that can't end a loop. A call to anything else might call input()
+# (which raises once the tests' inputs run out), raise or exit.
+_PURE_BUILTINS = {
+    "abs", "bool", "chr", "dict", "enumerate", "float", "format", "int",
+    "isinstance", "len", "list", "max", "min", "ord", "print", "range", "repr",
+    "reversed", "round", "set", "sorted", "str", "sum", "tuple", "type", "zip",
+}
+
+
+class PreflightManifest(NamedTuple):
+    """What an assignment's ``src`` directory is expected to contain."""
+
+    scripts: List[str]
+    functions: Dict[str, Dict[str, int | None]]
+
+
+class PreflightResult(NamedTuple):
+    """What the pre-flight check found."""
+
+    problems: List[str]
+    warnings: List[str]
+
+
+def get_manifest(config: dict | None, assignment_name: str) -> PreflightManifest:
+    """Build the pre-flight manifest for an assignment from the config.
+
+    Assignments without an entry under the ``preflight`` key only require
+    ``src/<assignment>.py`` to exist.
+
+    :param config: The parsed YAML configuration dictionary.
+    :type config: dict | None
+    :param assignment_name: The assignment name, e.g. ``shout``.
+    :type assignment_name: str
+    :return: The manifest for the assignment.
+    :rtype: PreflightManifest
+    """
+    entries = (config or {}).get("preflight") or {}
+    entry = entries.get(assignment_name) or {}
+    scripts = entry.get("scripts") or [assignment_name]
+    functions = entry.get("functions") or {}
+    if not isinstance(functions, dict) or not all(
+        isinstance(expected, dict) or expected is None for expected in functions.values()
+    ):
+        logger.warning(
+            "Ignoring malformed preflight functions for '%s': %s", assignment_name, functions
+        )
+        functions = {}
+    return PreflightManifest(
+        scripts=[str(script) for script in scripts],
+        functions={script: expected or {} for script, expected in functions.items()},
+    )
+
+
+def run_preflight(src_dir: Path, manifest: PreflightManifest) -> PreflightResult:
+    """Parse every script under ``src_dir`` and check it against the manifest.
+
+    Only syntax errors and missing scripts or functions in the scripts named by
+    the manifest block the run. Problems in any other file (which the tests
+    may never import) and possibly endless loops are only warnings.
+
+    :param src_dir: The student's ``src`` directory.
+    :type src_dir: Path
+    :param manifest: The expectations for the current assignment.
+    :type manifest: PreflightManifest
+    :return: Problems and warnings found; no problems if the code looks runnable.
+    :rtype: PreflightResult
+    """
+    result = PreflightResult(problems=[], warnings=[])
+    for script in manifest.scripts:
+        if not (src_dir / f"{script}.py").is_file():
+            result.problems.append(f"The script 'src/{script}.py' does not exist.")
+
+    if not src_dir.is_dir():
+        return result
+
+    required = set(manifest.scripts) | set(manifest.functions)
+    for path in sorted(src_dir.rglob("*.py")):
+        rel_name = f"src/{path.relative_to(src_dir).as_posix()}"
+        is_required = path.parent == src_dir and path.stem in required
+        found = result.problems if is_required else result.warnings
+        try:
+            tree = _parse_source(path)
+        except SyntaxError as e:
+            found.append(f"{rel_name}: syntax error on line {e.lineno}: {e.msg}")
+            continue
+        except (OSError, ValueError) as e:
+            found.append(f"{rel_name}: could not be read: {e}")
+            continue
+
+        result.warnings.extend(_find_blocking_loops(tree, rel_name))
+        expected_functions = manifest.functions.get(path.stem)
+        if expected_functions and is_required:
+            result.problems.extend(_check_functions(tree, expected_functions, rel_name))
+
+    logger.debug(
+        "Pre-flight found %d problem(s) and %d warning(s) in %s",
+        len(result.problems), len(result.warnings), src_dir,
+    )
+    return result
+
+
+def _parse_source(path: Path) -> ast.Module:
+    """Parse a script, reusing a recent parse of identical content.
+
+    :param path: The script to parse.
+    :type path: Path
+    :return: The parsed module.
+    :rtype: ast.Module
+    """
+    source = path.read_bytes()
+    return _parse_cached(hashlib.sha256(source).hexdigest(), source)
+
+
+@functools.lru_cache(maxsize=AST_CACHE_SIZE)
+def _parse_cached(digest: str, source: bytes) -> ast.Module:
+    """Parse source, cached by its content hash.
+
+    Batch runs see the same starter code in many repos, so a bounded cache
+    avoids re-parsing it without keeping every student's tree alive.
+
+    :param digest: The SHA-256 of ``source``, used as the cache key.
+    :type digest: str
+    :param source: The script's content.
+    :type source: bytes
+    :return: The parsed module.
+    :rtype: ast.Module
+    """
+    return ast.parse(source)
+
+
+def _check_functions(
+    tree: ast.Module, expected: Dict[str, int | None], rel_name: str
+) -> List[str]:
+    """Check that the module defines the expected top-level functions.
+
+    :param tree: The parsed module.
+    :type tree: ast.Module
+    :param expected: Function names mapped to the number of positional
+        arguments they must accept, or None to only check that they exist.
+    :type expected: Dict[str, int | None]
+    :param rel_name: The script's path for use in messages.
+    :type rel_name: str
+    :return: Problems found.
+    :rtype: List[str]
+    """
+    defined = {
+        node.name: node
+        for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    problems = []
+    for name, arg_count in expected.items():
+        node = defined.get(name)
+        if node is None:
+            problems.append(f"{rel_name}: the function '{name}' is not defined.")
+        elif arg_count is not None and not _accepts_arg_count(node.args, arg_count):
+            problems.append(
+                f"{rel_name}: the function '{name}' must accept {arg_count} "
+                f"argument(s)."
+            )
+    return problems
+
+
+def _accepts_arg_count(args: ast.arguments, count: int) -> bool:
+    """Check whether a signature can be called with ``count`` positional arguments.
+
+    :param args: The function's arguments node.
+    :type args: ast.arguments
+    :param count: The number of positional arguments the tests pass.
+    :type count: int
+    :return: If the call would bind.
+    :rtype: bool
+    """
+    positional = len(args.posonlyargs) + len(args.args)
+    required = positional - len(args.defaults)
+    required_kwonly = sum(default is None for default in args.kw_defaults)
+    if count < required or required_kwonly:
+        return False
+    return count <= positional or args.vararg is not None
+
+
+def _find_blocking_loops(tree: ast.Module, rel_name: str) -> List[str]:
+    """Flag module-level ``while True`` loops that can never end under test.
+
+    Tests patch ``input()`` to raise once its inputs run out, so a loop that
+    calls ``input()`` still terminates; one with no ``break``, ``raise`` or
+    call to anything but a pure builtin hangs pytest on import.
+
+    :param tree: The parsed module.
+    :type tree: ast.Module
+    :param rel_name: The script's path for use in messages.
+    :type rel_name: str
+    :return: Warnings found.
+    :rtype: List[str]
+    """
+    warnings = []
+    for node in _module_level_statements(tree.body):
+        if (
+            isinstance(node, ast.While)
+            and isinstance(node.test, ast.Constant)
+            and node.test.value
+            and not _loop_can_exit(node.body)
+        ):
+            warnings.append(
+                f"{rel_name}: the 'while True' loop on line {node.lineno} never "
+                f"calls input() or breaks, so it may run forever."
+            )
+    return warnings
+
+
+def _module_level_statements(body: List[ast.stmt]):
+    """Yield statements that run on import, descending into compound blocks.
+
+    The body of ``if __name__ == "__main__":`` is skipped since it doesn't run
+    when the tests import the script.
+
+    :param body: The statements to walk.
+    :type body: List[ast.stmt]
+    :yield: Each statement executed at module level.
+    """
+    for node in body:
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        if not (isinstance(node, ast.If) and _is_main_guard(node.test)):
+            yield from _module_level_statements(getattr(node, "body", []))
+        for field in ("orelse", "finalbody"):
+            yield from _module_level_statements(getattr(node, field, []))
+        for handler in getattr(node, "handlers", []):
+            yield from _module_level_statements(handler.body)
+
+
+def _is_main_guard(test: ast.expr) -> bool:
+    """Check whether an ``if`` test is ``__name__ == "__main__"``.
+
+    :param test: The ``if`` statement's test.
+    :type test: ast.expr
+    :return: If the test is a main guard.
+    :rtype: bool
+    """
+    if not (
+        isinstance(test, ast.Compare)
+        and len(test.ops) == 1
+        and isinstance(test.ops[0], ast.Eq)
+    ):
+        return False
+    operands = [test.left, test.comparators[0]]
+    return (
+        any(isinstance(o, ast.Name) and o.id == "__name__" for o in operands)
+        and any(isinstance(o, ast.Constant) and o.value == "__main__" for o in operands)
+    )
+
+
+def _loop_can_exit(nodes: List[ast.AST], in_nested_loop: bool = False) -> bool:
+    """Check whether anything in a loop body can end the loop.
+
+    :param nodes: The loop body, or part of it.
+    :type nodes: List[ast.AST]
+    :param in_nested_loop: If ``nodes`` are inside the body of a nested loop,
+        where a ``break`` only ends that loop.
+    :type in_nested_loop: bool
+    :return: If the loop contains a possible exit path.
+    :rtype: bool
+    """
+    for node in nodes:
+        if isinstance(node, (ast.Raise, ast.Return)):
+            return True
+        if isinstance(node, ast.Break) and not in_nested_loop:
+            return True
+        if isinstance(node, ast.Call) and not (
+            isinstance(node.func, ast.Name) and node.func.id in _PURE_BUILTINS
+        ):
+            return True
+        if isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+            # A break in the nested loop's body ends only that loop, but one in
+            # its ``else`` block ends the outer loop.
+            header = [node.test] if isinstance(node, ast.While) else [node.target, node.iter]
+            if (
+                _loop_can_exit(node.body, in_nested_loop=True)
+                or _loop_can_exit(header + node.orelse, in_nested_loop)
+            ):
+                return True
+            continue
+        if _loop_can_exit(list(ast.iter_child_nodes(node)), in_nested_loop):
+            return True
+    return False
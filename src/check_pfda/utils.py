@@ -7,7 +7,8 @@ import sys
 import time
 from contextlib import contextmanager
 from importlib import import_module
-from importlib.metadata import version as get_installed_version, PackageNotFoundError
+from importlib.metadata import (distributions, version as get_installed_version,
+                                PackageNotFoundError)
 from io import StringIO
 from pathlib import Path
 from typing import Any, List, NamedTuple
@@ -149,7 +150,7 @@ def get_tests(
                 bold=True,
             )
             logger.exception(
-                f"Error: Empty local test file for assignment '{assignment}'."
+                "Error: Empty local test file for assignment '%s'.", assignment
             )
             raise TestFileError(
                 f"Error: Received empty test file for assignment '{assignment}'."
@@ -157,7 +158,7 @@ def get_tests(
         if "def test_" not in content:
             click.secho("Warning: This may not be a valid test file.", fg="yellow")
             logger.warning(
-                f"Warning: This may not be a valid test file for assignment '{assignment}'."
+                "Warning: This may not be a valid test file for assignment '%s'.", assignment
             )
         return content
 
@@ -171,7 +172,7 @@ def get_tests(
             fg="red",
             bold=True,
         )
-        logger.exception(f"Error fetching test file for assignment '{assignment}': {e}")
+        logger.exception("Error fetching test file for assignment '%s': %s", assignment, e)
         raise TestFileError(
             f"Error fetching test file for assignment '{assignment}': {e}"
         )
@@ -183,7 +184,7 @@ def get_tests(
             bold=True,
         )
         logger.exception(
-            f"Error: Received empty test file for assignment '{assignment}'."
+            "Error: Received empty test file for assignment '%s'.", assignment
         )
         raise TestFileError(
             f"Error: Received empty test file for assignment '{assignment}'."
@@ -192,7 +193,7 @@ def get_tests(
     if "def test_" not in r.text:
         click.secho("Warning: This may not be a valid test file.", fg="yellow")
         logger.warning(
-            f"Warning: This may not be a valid test file for assignment '{assignment}'."
+            "Warning: This may not be a valid test file for assignment '%s'.", assignment
         )
     return r.text
 
@@ -407,10 +408,10 @@ def _load_config_yaml() -> dict | None:
             config = yaml.safe_load(file)
         return config
     except FileNotFoundError:
-        logger.exception(f"YAML file not found: {config_path}")
+        logger.exception("YAML file not found: %s", config_path)
         return None
     except yaml.YAMLError as e:
-        logger.exception(f"Error parsing YAML file: {e}")
+        logger.exception("Error parsing YAML file: %s", e)
         return None
 
 
@@ -484,13 +485,13 @@ def _match_assignment_from_config(
                 result = AssignmentInfo(
                     chapter=str(chapter_key)[1:], name=str(assignment).replace("-", "_")
                 )
-                logger.debug(f"Current assignment info: {result}")
+                logger.debug("Current assignment info: %s", result)
                 return result
 
     # No match found
     logger.debug("Error parsing cwd and matching it against config. Contact your TA.")
-    logger.debug(f"Config: {config}")
-    logger.debug(f"Repo path: {repo_path_str}")
+    logger.debug("Config: %s", config)
+    logger.debug("Repo path: %s", repo_path_str)
     return None
 
 
@@ -549,12 +550,12 @@ def _set_up_test_file(
 ):
     chapter = assignment.chapter
     assignment_name = assignment.name
-    logger.debug(f"Chapter: {chapter}, Assignment: {assignment}")
+    logger.debug("Chapter: %s, Assignment: %s", chapter, assignment)
     tests = get_tests(chapter, assignment_name, local_tests_root)
     test_file_path = repo_tests_dir / f"test_{assignment_name}.py"
     with open(test_file_path, "w", encoding="utf-8") as f:
         f.write(tests)
-    logger.debug(f"Wrote test file to: {test_file_path}")
+    logger.debug("Wrote test file to: %s", test_file_path)
     return test_file_path
 
 
@@ -573,24 +574,23 @@ def _add_to_path(path: str | Path):
 
 
 def _log_platform_info():
-    logger.debug(f"Python version: {sys.version}")
-    logger.debug(f"Python executable: {sys.executable}")
-    logger.debug(f"Platform: {platform.platform()}")
-    logger.debug(f"System: {platform.system()} {platform.release()}")
-    logger.debug(f"Machine: {platform.machine()}")
-    logger.debug(f"Processor: {platform.processor()}")
+    logger.debug("Python version: %s", sys.version)
+    logger.debug("Python executable: %s", sys.executable)
+    logger.debug("Platform: %s", platform.platform())
+    logger.debug("System: %s %s", platform.system(), platform.release())
+    logger.debug("Machine: %s", platform.machine())
+    logger.debug("Processor: %s", platform.processor())
+
+
+class _InstalledPackages:
+    """Lists installed packages when formatted, so the lookup runs on the log thread."""
+
+    def __str__(self) -> str:
+        packages = sorted(
+            (d.metadata["Name"] or "", d.version) for d in distributions()
+        )
+        return "".join(f"\n  {name}=={version}" for name, version in packages)
 
 
 def _log_package_info():
-    logger.debug(f"Installed packages:")
-    try:
-        import pkg_resources
-
-        installed_packages = [
-            (d.project_name, d.version) for d in pkg_resources.working_set
-        ]
-        installed_packages.sort()
-        for package_name, version in installed_packages:
-            logger.debug(f"  {package_name}=={version}")
-    except ImportError as e:
-        logger.debug(f"Unable to retrieve package information: {e}")
+    logger.debug("Installed packages:%s", _InstalledPackages())